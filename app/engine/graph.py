@@ -1,13 +1,15 @@
 # engine/graph.py
-from typing import Optional
-from models.graph_models import GraphDefinition
+from typing import Dict, Optional, Tuple
+from models.graph_models import GraphDefinition, GraphNodeConfig
 from engine.registry import tool_registry
+from storage.sqlite_store import get_graph, get_graph_version
 
 
 class GraphEngine:
     """
     Minimal graph engine:
-    - Each node maps to a tool (function) in the registry.
+    - Each node maps to a tool (function) in the registry,
+      or to another stored graph run as a sub-workflow.
     - Edges define default next node.
     - Nodes can override next node by setting '_next_node' in state.
     """
@@ -18,9 +20,77 @@ class GraphEngine:
     def get_start_node(self) -> str:
         return self.graph.start_node
 
+    def get_node_config(self, node_name: str) -> GraphNodeConfig:
+        return self.graph.nodes[node_name]
+
     def get_tool_for_node(self, node_name: str):
         node_cfg = self.graph.nodes[node_name]
         return tool_registry.get(node_cfg.tool_name)
 
+    def get_subgraph_for_node(self, node_name: str, resolved: Dict[str, "GraphEngine"]) -> Optional["GraphEngine"]:
+        """
+        Return the shared compiled engine for a sub-workflow node, or None for tool nodes.
+        `resolved` holds the engines already looked up during the current run, so each
+        child is checked against storage once per run rather than once per invocation.
+        """
+        node_cfg = self.graph.nodes[node_name]
+        if node_cfg.subgraph_id is None:
+            return None
+        engine = resolved.get(node_cfg.subgraph_id)
+        if engine is None:
+            engine = resolved[node_cfg.subgraph_id] = load_engine(node_cfg.subgraph_id)
+        return engine
+
     def get_default_next_node(self, node_name: str) -> Optional[str]:
         return self.graph.edges.get(node_name)
+
+
+# Compiled engines for graphs used as sub-workflows, shared by every parent graph
+# and across runs. Checked against the stored content hash when a run first uses
+# a child, so it is only reloaded when its definition changes (in any process).
+_ENGINE_CACHE: Dict[str, Tuple[str, GraphEngine]] = {}
+
+
+def load_engine(graph_id: str) -> GraphEngine:
+    version = get_graph_version(graph_id)
+    if version is None:
+        raise KeyError(f"Graph '{graph_id}' not found")
+
+    cached = _ENGINE_CACHE.get(graph_id)
+    if cached is not None and cached[0] == version:
+        return cached[1]
+
+    graph = get_graph(graph_id)
+    if graph is None:
+        raise KeyError(f"Graph '{graph_id}' not found")
+    engine = GraphEngine(graph)
+    _ENGINE_CACHE[graph_id] = (version, engine)
+    return engine
+
+
+def validate_subgraphs(graph: GraphDefinition):
+    """
+    Check that every sub-workflow node references a stored graph and that
+    `graph` does not (directly or indirectly) include itself.
+    Raises ValueError describing the first problem found.
+    """
+    def children(g: GraphDefinition):
+        return [cfg.subgraph_id for cfg in g.nodes.values() if cfg.subgraph_id is not None]
+
+    for node_name, cfg in graph.nodes.items():
+        if cfg.subgraph_id is not None and cfg.subgraph_id != graph.id and get_graph(cfg.subgraph_id) is None:
+            raise ValueError(f"Node '{node_name}' references unknown graph '{cfg.subgraph_id}'")
+
+    # Depth-first walk over stored children; reaching graph.id again is a cycle
+    stack = [(child, [graph.id, child]) for child in children(graph)]
+    seen = set()
+    while stack:
+        graph_id, path = stack.pop()
+        if graph_id == graph.id:
+            raise ValueError(f"Sub-workflow cycle: {' -> '.join(path)}")
+        if graph_id in seen:
+            continue
+        seen.add(graph_id)
+        child_graph = get_graph(graph_id)
+        if child_graph is not None:
+            stack.extend((child, path + [child]) for child in children(child_graph))
@@ -0,0 +1,103 @@
+# engine/loops.py
+import copy
+import time
+from typing import Any, Dict, Optional
+
+from models.graph_models import GraphDefinition, LoopConfig
+
+
+class LoopReason:
+    CONVERGED = "converged"
+    MAX_ITERATIONS = "max_iterations"
+    EXITED = "exited"
+
+
+class LoopTracker:
+    """
+    Loop bounds and convergence detection for one graph execution:
+    - A transition to a node first visited no later than the current one
+      (a back-edge) is a loop iteration.
+    - Declared loops (GraphDefinition.loops) set max_iterations and watched keys;
+      other loops watch all non-internal state keys and are bounded by MAX_STEPS.
+    - An iteration that leaves the watched keys unchanged ends the loop.
+    """
+
+    def __init__(self, graph: GraphDefinition, metrics: Dict[str, Dict[str, Any]], prefix: str = ""):
+        self.graph = graph
+        self.metrics = metrics
+        self.prefix = prefix
+        self._first_visit: Dict[str, int] = {}
+        self._active: Dict[str, Dict[str, Any]] = {}
+
+    def _config(self, node_name: str, target: str) -> Optional[LoopConfig]:
+        cfg = self.graph.loops.get(node_name)
+        if cfg is not None and cfg.target == target:
+            return cfg
+        return None
+
+    def _close(self, key: str, reason: str):
+        active = self._active.pop(key)
+        metrics = self.metrics[key]
+        metrics["stop_reason"] = reason
+        metrics["seconds"] += time.perf_counter() - active["started"]
+
+    def check(self, node_name: str, next_node: Optional[str], state: Dict[str, Any]) -> Optional[str]:
+        """
+        Called after `node_name` ran, before moving to `next_node`.
+        Returns a stop message if the loop must not re-enter `next_node`, else None.
+        """
+        self._first_visit.setdefault(node_name, len(self._first_visit))
+
+        # The loop's source node moving elsewhere means the loop ended on its own
+        for key, active in list(self._active.items()):
+            if active["node"] == node_name and active["target"] != next_node:
+                self._close(key, LoopReason.EXITED)
+
+        # Forward edges, including ones inside a loop body, aren't iterations
+        if next_node is None or next_node not in self._first_visit:
+            return None
+        if self._first_visit[next_node] > self._first_visit[node_name]:
+            return None
+
+        key = f"{self.prefix}{node_name}->{next_node}"
+        cfg = self._config(node_name, next_node)
+        watch = cfg.watch if cfg and cfg.watch else [k for k in state if not k.startswith("_")]
+        snapshot = {k: copy.deepcopy(state[k]) for k in watch if k in state}
+
+        # Metrics are run-wide totals (a loop may run again, e.g. inside an outer
+        # loop or a repeated sub-workflow); bounds apply to each activation.
+        metrics = self.metrics.setdefault(key, {
+            "activations": 0,
+            "iterations": 0,
+            "max_iterations": cfg.max_iterations if cfg else None,
+            "stop_reason": None,
+            "seconds": 0.0,
+        })
+        active = self._active.get(key)
+        if active is None:
+            active = {
+                "node": node_name,
+                "target": next_node,
+                "snapshot": None,
+                "iterations": 0,
+                "started": time.perf_counter(),
+            }
+            self._active[key] = active
+            metrics["activations"] += 1
+        elif snapshot == active["snapshot"]:
+            self._close(key, LoopReason.CONVERGED)
+            return f"Loop converged after {active['iterations']} iteration(s), stopping."
+
+        if cfg and active["iterations"] >= cfg.max_iterations:
+            self._close(key, LoopReason.MAX_ITERATIONS)
+            return f"Reached max loops ({cfg.max_iterations}), stopping."
+
+        active["snapshot"] = snapshot
+        active["iterations"] += 1
+        metrics["iterations"] += 1
+        return None
+
+    def finish(self):
+        """Close loops still open when the execution ends."""
+        for key in list(self._active):
+            self._close(key, LoopReason.EXITED)
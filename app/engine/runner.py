@@ -1,22 +1,140 @@
 # engine/runner.py
-from typing import Dict, Any, Tuple
-from models.graph_models import GraphDefinition
+import time
+from typing import Dict, Any, Optional, Tuple
+from models.graph_models import GraphDefinition, GraphNodeConfig
 from models.run_models import RunRecord, RunStatus, new_run_id
 from storage.sqlite_store import save_run
+from storage.blob_store import offload_large_values
 from engine.graph import GraphEngine
+from engine.loops import LoopTracker
 
 
 MAX_STEPS = 100  # safety guard
+MAX_SUBGRAPH_DEPTH = 10  # guards against graphs that (indirectly) include themselves
 
 
-def run_graph(graph: GraphDefinition, initial_state: Dict[str, Any]) -> Tuple[RunRecord, Dict[str, Any], list]:
-    run_id = new_run_id()
+def _public_items(state: Dict[str, Any]) -> Dict[str, Any]:
+    # Engine-internal keys ('_next_node', loop counters, ...) don't cross graph boundaries
+    return {k: v for k, v in state.items() if not k.startswith("_")}
+
+
+def _resolve_next_node(
+    engine: GraphEngine,
+    node_name: str,
+    state: Dict[str, Any],
+    log: list,
+    loops: LoopTracker,
+    prefix: str = "",
+) -> Optional[str]:
+    # Branching / looping: node can set '_next_node'
+    override_next = state.pop("_next_node", None)
+    default_next = engine.get_default_next_node(node_name)
+    next_node = override_next or default_next
+
+    # Loops are bounded and stop once an iteration no longer changes state
+    stop_message = loops.check(node_name, next_node, state)
+    if stop_message:
+        log.append(f"Loop {prefix}{node_name} -> {prefix}{next_node}: {stop_message}")
+        state["_loop_message"] = stop_message
+        next_node = default_next if default_next != next_node else None
+    elif override_next:
+        log.append(f"Next node overridden by state to: {prefix}{override_next}")
+        return override_next
+
+    if next_node:
+        log.append(f"Next node (default edge): {prefix}{next_node}")
+    else:
+        log.append(f"No next node, {'sub-workflow' if prefix else 'workflow'} completed")
+    return next_node
+
+
+def _run_node(
+    engine: GraphEngine,
+    node_name: str,
+    state: Dict[str, Any],
+    log: list,
+    timings: Dict[str, float],
+    loop_metrics: Dict[str, Dict[str, Any]],
+    subgraphs: Dict[str, GraphEngine],
+    path: str,
+    depth: int,
+) -> Dict[str, Any]:
+    log.append(f"Running node: {path}")
+    started = time.perf_counter()
+
+    child = engine.get_subgraph_for_node(node_name, subgraphs)
+    if child is None:
+        # Call node function
+        tool = engine.get_tool_for_node(node_name)
+        state = tool(state) or state
+    else:
+        state = _run_subgraph(
+            engine.get_node_config(node_name), child, state, log, timings, loop_metrics, subgraphs, path, depth + 1
+        )
+
+    timings[path] = timings.get(path, 0.0) + time.perf_counter() - started
+    return state
+
+
+def _run_subgraph(
+    node_cfg: GraphNodeConfig,
+    child: GraphEngine,
+    state: Dict[str, Any],
+    log: list,
+    timings: Dict[str, float],
+    loop_metrics: Dict[str, Dict[str, Any]],
+    subgraphs: Dict[str, GraphEngine],
+    path: str,
+    depth: int,
+) -> Dict[str, Any]:
+    if depth > MAX_SUBGRAPH_DEPTH:
+        raise RuntimeError(f"Max sub-workflow depth exceeded at '{path}' (recursive graph?)")
+
+    if node_cfg.input_map:
+        child_state = {
+            child_key: state[parent_key]
+            for parent_key, child_key in node_cfg.input_map.items()
+            if parent_key in state
+        }
+    else:
+        child_state = _public_items(state)
+
+    loops = LoopTracker(child.graph, loop_metrics, prefix=f"{path}/")
+    current = child.get_start_node()
+    steps = 0
+    while current is not None:
+        steps += 1
+        if steps > MAX_STEPS:
+            raise RuntimeError(f"Max steps exceeded in sub-workflow '{path}' (possible infinite loop)")
+        child_state = _run_node(
+            child, current, child_state, log, timings, loop_metrics, subgraphs, f"{path}/{current}", depth
+        )
+        current = _resolve_next_node(child, current, child_state, log, loops, prefix=f"{path}/")
+    loops.finish()
+
+    if node_cfg.output_map:
+        for child_key, parent_key in node_cfg.output_map.items():
+            if child_key in child_state:
+                state[parent_key] = child_state[child_key]
+    else:
+        state.update(_public_items(child_state))
+    return state
+
+
+def run_graph(
+    graph: GraphDefinition,
+    initial_state: Dict[str, Any],
+    run_id: Optional[str] = None,
+) -> Tuple[RunRecord, Dict[str, Any], list]:
+    # run_id is passed by queue workers so the submitted run record is reused
+    run_id = run_id or new_run_id()
     engine = GraphEngine(graph)
 
     run = RunRecord(
         id=run_id,
         graph_id=graph.id,
-        state=initial_state.copy(),
+        # Large inputs (e.g. source code) are stored once as blobs; state keeps references
+        state=offload_large_values(initial_state.copy()),
         current_node=engine.get_start_node(),
         status=RunStatus.RUNNING,
         log=[]
@@ -24,30 +142,17 @@ def run_graph(graph: GraphDefinition, initial_state: Dict[str, Any]) -> Tuple[Ru
     save_run(run)
 
     steps = 0
+    loops = LoopTracker(graph, run.loops)
+    subgraphs: Dict[str, GraphEngine] = {}  # child engines resolved once per run
 
     try:
         while run.current_node is not None and steps < MAX_STEPS:
             steps += 1
             node_name = run.current_node
-            tool = engine.get_tool_for_node(node_name)
-
-            run.log.append(f"Running node: {node_name}")
-            # Call node function
-            new_state = tool(run.state) or run.state
-            run.state = new_state
-
-            # Branching / looping: node can set '_next_node'
-            override_next = run.state.pop("_next_node", None)
-            if override_next:
-                run.log.append(f"Next node overridden by state to: {override_next}")
-                run.current_node = override_next
-            else:
-                next_node = engine.get_default_next_node(node_name)
-                run.current_node = next_node
-                if next_node:
-                    run.log.append(f"Next node (default edge): {next_node}")
-                else:
-                    run.log.append("No next node, workflow completed")
+            run.state = _run_node(
+                engine, node_name, run.state, run.log, run.timings, run.loops, subgraphs, node_name, depth=0
+            )
+            run.current_node = _resolve_next_node(engine, node_name, run.state, run.log, loops)
 
         if steps >= MAX_STEPS:
             run.status = RunStatus.FAILED
@@ -60,5 +165,7 @@ def run_graph(graph: GraphDefinition, initial_state: Dict[str, Any]) -> Tuple[Ru
         run.error = str(exc)
         run.log.append(f"Error: {exc}")
 
+    loops.finish()
+    offload_large_values(run.state)
     save_run(run)
     return run, run.state, run.log
@@ -0,0 +1,133 @@
+# engine/worker.py
+"""
+Standalone queue worker.
+
+Claims jobs from the SQLite `jobs` table and executes them with `run_graph`.
+Start several of these (on one host or many sharing the DB) to scale out:
+
+    python -m engine.worker --processes 4
+"""
+import argparse
+import multiprocessing
+import os
+import signal
+import socket
+import threading
+import time
+
+from engine.runner import run_graph
+from models.run_models import RunStatus
+from storage.sqlite_store import (
+    LEASE_SECONDS,
+    JobStatus,
+    claim_job,
+    complete_job,
+    get_graph,
+    get_run,
+    heartbeat_job,
+    init_db,
+    release_job,
+    save_run,
+)
+from workflows.code_review import register_code_review_tools
+
+POLL_INTERVAL = 0.5  # seconds to sleep when the queue is empty
+
+
+def _heartbeat_loop(job_id: str, worker_id: str, stop: threading.Event):
+    # Renew the lease well before it expires so long runs are not re-claimed
+    while not stop.wait(LEASE_SECONDS / 3):
+        if not heartbeat_job(job_id, worker_id):
+            break
+
+
+def process_job(job, worker_id: str):
+    """Execute a single claimed job and record its outcome."""
+    run = get_run(job["id"])
+    graph = get_graph(job["graph_id"])
+    if run is None or graph is None:
+        complete_job(job["id"], worker_id, JobStatus.FAILED)
+        if run is not None:
+            run.status = RunStatus.FAILED
+            run.error = "Graph not found"
+            save_run(run)
+        return
+
+    stop = threading.Event()
+    heartbeat = threading.Thread(
+        target=_heartbeat_loop, args=(job["id"], worker_id, stop), daemon=True
+    )
+    heartbeat.start()
+    try:
+        run, _, _ = run_graph(graph, run.state, run_id=run.id)
+    except KeyboardInterrupt:
+        # Shutting down mid-run: hand the job back instead of waiting for the lease
+        release_job(job["id"], worker_id, "Worker interrupted")
+        raise
+    finally:
+        stop.set()
+        heartbeat.join()
+
+    status = JobStatus.DONE if run.status == RunStatus.COMPLETED else JobStatus.FAILED
+    complete_job(job["id"], worker_id, status)
+
+
+def worker_loop(worker_id: str, max_jobs: int = 0):
+    """Claim and run jobs until interrupted (or `max_jobs` have run, if > 0)."""
+    init_db()
+    register_code_review_tools()
+
+    done = 0
+    while not max_jobs or done < max_jobs:
+        job = claim_job(worker_id)
+        if job is None:
+            time.sleep(POLL_INTERVAL)
+            continue
+        process_job(job, worker_id)
+        done += 1
+
+
+def _worker_main(index: int):
+    worker_id = f"{socket.gethostname()}-{os.getpid()}-{index}"
+    try:
+        worker_loop(worker_id)
+    except KeyboardInterrupt:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run graph queue workers")
+    parser.add_argument(
+        "--processes", type=int, default=1, help="Number of worker processes to start"
+    )
+    args = parser.parse_args()
+
+    # Treat SIGTERM like Ctrl+C: a worker hands its job back (release_job) and
+    # stopping the parent also stops its children, which inherit the handler.
+    def _handle_sigterm(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, _handle_sigterm)
+
+    if args.processes <= 1:
+        _worker_main(0)
+        return
+
+    procs = [
+        multiprocessing.Process(target=_worker_main, args=(i,))
+        for i in range(args.processes)
+    ]
+    for p in procs:
+        p.start()
+    try:
+        for p in procs:
+            p.join()
+    except KeyboardInterrupt:
+        for p in procs:
+            p.terminate()
+        for p in procs:
+            p.join()
+
+
+if __name__ == "__main__":
+    main()
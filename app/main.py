@@ -1,21 +1,38 @@
 # main.py
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import HTMLResponse
-from typing import Dict, Any
+from fastapi import Body, FastAPI, HTTPException, Query
+from fastapi.responses import FileResponse, HTMLResponse, Response
+from typing import Dict, Any, Optional
 from models.graph_models import (
     GraphCreateRequest,
     GraphCreateResponse,
     GraphRunRequest,
-    GraphRunResponse,
+    GraphSubmitResponse,
     GraphDefinition,
+    BlobUploadResponse,
 )
-from models.run_models import RunRecord
-from storage.sqlite_store import init_db, save_graph, get_graph, get_run
+from models.run_models import RunRecord, RunStatus, new_run_id
+from storage.sqlite_store import (
+    init_db,
+    save_graph,
+    get_graph,
+    get_run_data,
+    get_run_fields,
+    open_run_data,
+    save_run,
+    enqueue_job,
+)
+from storage.blob_store import put_blob, blob_path, offload_large_values
+from storage.projection import parse_paths, project
+from responses import CHUNK_SIZE, json_response, stored_json_response
+from engine.graph import validate_subgraphs
 from engine.runner import run_graph
 from workflows.code_review import register_code_review_tools, create_code_review_graph
 
 app = FastAPI(title="Minimal Workflow / Graph Engine")
 
+FIELDS_DESC = "Comma-separated dot paths to include, e.g. final_state.quality_score,log"
+EXCLUDE_DESC = "Comma-separated dot paths to drop, e.g. log,state.code"
+
 
 @app.on_event("startup")
 def startup_event():
@@ -42,31 +59,117 @@ def create_graph(req: GraphCreateRequest):
         nodes=req.nodes,
         edges=req.edges,
         start_node=req.start_node,
+        loops=req.loops,
     )
 
     if get_graph(graph.id):
         raise HTTPException(status_code=400, detail="Graph with this id already exists")
 
+    try:
+        validate_subgraphs(graph)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
     save_graph(graph)
     return GraphCreateResponse(graph_id=graph.id)
 
 
-@app.post("/graph/run", response_model=GraphRunResponse)
-def run_graph_endpoint(req: GraphRunRequest):
+@app.post(
+    "/graph/run",
+    response_class=Response,
+    description=(
+        "Run a graph and return `run_id`, `final_state` and `log`. "
+        "`fields`/`exclude` project the response, so any of these keys may be absent."
+    ),
+)
+def run_graph_endpoint(
+    req: GraphRunRequest,
+    fields: Optional[str] = Query(None, description=FIELDS_DESC),
+    exclude: Optional[str] = Query(None, description=EXCLUDE_DESC),
+):
     graph = get_graph(req.graph_id)
     if not graph:
         raise HTTPException(status_code=404, detail="Graph not found")
 
     run, final_state, log = run_graph(graph, req.initial_state)
-    return GraphRunResponse(run_id=run.id, final_state=final_state, log=log)
+    data = {"run_id": run.id, "final_state": final_state, "log": log}
+    return json_response(project(data, parse_paths(fields), parse_paths(exclude)))
 
 
-@app.get("/graph/state/{run_id}", response_model=RunRecord)
-def get_run_state(run_id: str):
-    run = get_run(run_id)
-    if not run:
+@app.post("/graph/submit", response_model=GraphSubmitResponse)
+def submit_graph_endpoint(req: GraphRunRequest):
+    """Queue a run for a worker process; poll /graph/state/{run_id} for the result."""
+    graph = get_graph(req.graph_id)
+    if not graph:
+        raise HTTPException(status_code=404, detail="Graph not found")
+
+    run = RunRecord(
+        id=new_run_id(),
+        graph_id=graph.id,
+        state=offload_large_values(dict(req.initial_state)),
+        current_node=graph.start_node,
+        status=RunStatus.PENDING,
+    )
+    save_run(run)
+    enqueue_job(run.id, graph.id)
+    return GraphSubmitResponse(run_id=run.id, status=run.status)
+
+
+@app.get(
+    "/graph/state/{run_id}",
+    response_class=Response,
+    description=(
+        "Return the stored run record (`id`, `graph_id`, `state`, `log`, `timings`, "
+        "`loops`, `current_node`, `status`, `error`). "
+        "`fields`/`exclude` project the response, so any of its keys may be absent."
+    ),
+)
+def get_run_state(
+    run_id: str,
+    fields: Optional[str] = Query(None, description=FIELDS_DESC),
+    exclude: Optional[str] = Query(None, description=EXCLUDE_DESC),
+):
+    # Projection happens in SQLite where possible; the stored record is never
+    # re-validated through RunRecord just to be serialized again.
+    field_paths = parse_paths(fields)
+    exclude_paths = parse_paths(exclude)
+    if field_paths:
+        data = get_run_fields(run_id, field_paths)
+        if data is None:
+            raise HTTPException(status_code=404, detail="Run not found")
+        return json_response(project(data, [], exclude_paths))
+
+    if exclude_paths:
+        data = get_run_data(run_id, exclude_paths)
+        if data is None:
+            raise HTTPException(status_code=404, detail="Run not found")
+        return Response(content=data, media_type="application/json")
+
+    stored = open_run_data(run_id, CHUNK_SIZE)
+    if stored is None:
         raise HTTPException(status_code=404, detail="Run not found")
-    return run
+    return stored_json_response(*stored)
+
+
+# --- Blob Endpoints ---
+
+@app.post("/blobs", response_model=BlobUploadResponse)
+def upload_blob(data: bytes = Body(..., media_type="application/octet-stream")):
+    """Upload a large payload once (raw body) and reference it from any number of runs."""
+    # Sync endpoint: hashing and writing a large payload runs in the threadpool, not the event loop
+    return BlobUploadResponse(ref=put_blob(data))
+
+
+@app.get("/blobs/{blob_hash}")
+def download_blob(blob_hash: str):
+    try:
+        path = blob_path(blob_hash)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="Blob not found")
+    # Streamed from disk in chunks rather than read into memory
+    return FileResponse(path, media_type="application/octet-stream")
 
 @app.get("/", response_class=HTMLResponse)
 def ui_home():
@@ -273,7 +376,12 @@ def ui_home():
                     }
                 };
 
-                const res = await fetch("/graph/run", {
+                const fields = [
+                    "run_id", "log",
+                    "final_state.quality_score", "final_state.functions",
+                    "final_state.complexity", "final_state.issues", "final_state.suggestions"
+                ].join(",");
+                const res = await fetch("/graph/run?fields=" + fields, {
                     method: "POST",
                     headers: {
                         "Content-Type": "application/json"
@@ -1,12 +1,40 @@
 # models/graph_models.py
-from typing import Dict, Optional
-from pydantic import BaseModel, Field
+from typing import Dict, List, Optional
+from pydantic import BaseModel, Field, model_validator
 import uuid
 
 
 class GraphNodeConfig(BaseModel):
-    """Maps a logical node name to a tool/function in the registry."""
-    tool_name: str = Field(..., description="Name of the tool in the registry")
+    """
+    Maps a logical node name to a tool/function in the registry,
+    or to another stored graph that runs as a sub-workflow.
+    """
+    tool_name: Optional[str] = Field(None, description="Name of the tool in the registry")
+    subgraph_id: Optional[str] = Field(None, description="ID of a stored graph to run as a sub-workflow")
+    input_map: Dict[str, str] = Field(
+        default_factory=dict,
+        description="Parent state key -> child state key (empty: pass all non-internal keys)",
+    )
+    output_map: Dict[str, str] = Field(
+        default_factory=dict,
+        description="Child state key -> parent state key (empty: merge back all non-internal keys)",
+    )
+
+    @model_validator(mode="after")
+    def check_target(self):
+        if (self.tool_name is None) == (self.subgraph_id is None):
+            raise ValueError("Exactly one of tool_name or subgraph_id must be set")
+        return self
+
+
+class LoopConfig(BaseModel):
+    """Bounds for a loop: its source node jumping back to `target`."""
+    target: str = Field(..., description="Node the loop re-enters")
+    max_iterations: int = Field(3, ge=0, description="Max times the loop may re-enter `target`")
+    watch: List[str] = Field(
+        default_factory=list,
+        description="State keys checked for progress (empty: all non-internal keys)",
+    )
 
 
 class GraphDefinition(BaseModel):
@@ -14,12 +42,15 @@ class GraphDefinition(BaseModel):
     nodes: Dict[str, GraphNodeConfig]
     edges: Dict[str, Optional[str]]
     start_node: str
+    # Keyed by the node whose transition closes the loop
+    loops: Dict[str, LoopConfig] = Field(default_factory=dict)
 
 
 class GraphCreateRequest(BaseModel):
     nodes: Dict[str, GraphNodeConfig]
     edges: Dict[str, Optional[str]]
     start_node: str
+    loops: Dict[str, LoopConfig] = Field(default_factory=dict)
 
 
 class GraphCreateResponse(BaseModel):
@@ -31,10 +62,14 @@ class GraphRunRequest(BaseModel):
     initial_state: Dict[str, object]
 
 
-class GraphRunResponse(BaseModel):
+class GraphSubmitResponse(BaseModel):
     run_id: str
-    final_state: Dict[str, object]
-    log: list
+    status: str
+
+
+class BlobUploadResponse(BaseModel):
+    # Use `ref` as a state value, e.g. initial_state = {"code": ref}
+    ref: Dict[str, object]
 
 
 def new_graph_id() -> str:
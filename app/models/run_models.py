@@ -1,5 +1,5 @@
 # models/run_models.py
-from typing import Dict, List, Optional
+from typing import Any, Dict, List, Optional
 from pydantic import BaseModel, Field
 import uuid
 
@@ -16,6 +16,10 @@ class RunRecord(BaseModel):
     graph_id: str
     state: Dict[str, object] = Field(default_factory=dict)
     log: List[str] = Field(default_factory=list)
+    # Cumulative seconds per node path; sub-workflow steps appear as "parent/child"
+    timings: Dict[str, float] = Field(default_factory=dict)
+    # Per-loop metrics keyed by "node->target": iterations, max_iterations, stop_reason, seconds
+    loops: Dict[str, Dict[str, Any]] = Field(default_factory=dict)
     current_node: Optional[str] = None
     status: str = RunStatus.PENDING
     error: Optional[str] = None
@@ -0,0 +1,24 @@
+# responses.py
+import json
+from typing import Any, Iterator
+
+from fastapi.responses import Response, StreamingResponse
+
+CHUNK_SIZE = 64 * 1024  # stored records larger than this are streamed
+
+
+def json_response(data: Any) -> Response:
+    # One-shot json.dumps uses the C encoder; incremental iterencode is pure Python
+    return Response(content=json.dumps(data), media_type="application/json")
+
+
+def stored_json_response(size: int, chunks: Iterator[bytes]) -> Response:
+    """
+    Send JSON that is already encoded in storage. Records larger than
+    CHUNK_SIZE are streamed as they are read instead of loaded whole.
+    """
+    if size <= CHUNK_SIZE:
+        return Response(content=b"".join(chunks), media_type="application/json")
+    return StreamingResponse(
+        chunks, media_type="application/json", headers={"Content-Length": str(size)}
+    )
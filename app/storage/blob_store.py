@@ -0,0 +1,113 @@
+# storage/blob_store.py
+"""
+Content-addressed blob store on local disk.
+
+Large state values (e.g. the source file in state["code"]) are written once,
+keyed by their SHA-256, and replaced in state by a small reference:
+
+    {"$blob": "<sha256>", "size": <bytes>}
+
+Runs, the runs table and API responses then carry the reference only.
+Tools resolve references lazily with `resolve_text` / `blob_view`.
+"""
+import hashlib
+import mmap
+import os
+import re
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+BLOB_DIR = Path(__file__).resolve().parent / "blobs"
+BLOB_THRESHOLD = 16 * 1024  # string values at least this many characters are offloaded
+
+DECODE_CACHE_BYTES = 8 * 1024 * 1024  # total size of decoded blobs kept per process
+
+_HASH_RE = re.compile(r"^[0-9a-f]{64}$")
+
+# Recently decoded blobs (hash -> (text, size in bytes)), least recently used first
+_decoded: "OrderedDict[str, Tuple[str, int]]" = OrderedDict()
+_decoded_bytes = 0
+_decoded_lock = threading.Lock()
+
+
+def blob_path(blob_hash: str) -> Path:
+    """Location of a blob on disk (whether or not it exists yet)."""
+    if not _HASH_RE.match(blob_hash):
+        raise ValueError(f"Invalid blob hash '{blob_hash}'")
+    return BLOB_DIR / blob_hash[:2] / blob_hash
+
+
+def is_blob_ref(value: Any) -> bool:
+    return isinstance(value, dict) and "$blob" in value
+
+
+def put_blob(data: bytes) -> Dict[str, Any]:
+    """Store bytes (deduplicated by hash) and return a reference to them."""
+    blob_hash = hashlib.sha256(data).hexdigest()
+    path = blob_path(blob_hash)
+    if not path.exists():
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write then rename so concurrent writers/readers never see a partial blob
+        fd, tmp = tempfile.mkstemp(dir=path.parent)
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    return {"$blob": blob_hash, "size": len(data)}
+
+
+def blob_view(ref: Dict[str, Any]) -> memoryview:
+    """Zero-copy read-only view of a blob's bytes, backed by mmap."""
+    with open(blob_path(ref["$blob"]), "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return memoryview(b"")
+        mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return memoryview(mm)
+
+
+def _decode_blob(blob_hash: str) -> str:
+    global _decoded_bytes
+    with _decoded_lock:
+        cached = _decoded.get(blob_hash)
+        if cached is not None:
+            _decoded.move_to_end(blob_hash)
+            return cached[0]
+
+    data = blob_path(blob_hash).read_bytes()
+    text = data.decode("utf-8")
+    if len(data) > DECODE_CACHE_BYTES:
+        return text  # too large to cache; each caller decodes its own copy
+
+    # Bounded by total bytes so a few huge files can't pin memory in every process
+    with _decoded_lock:
+        if blob_hash not in _decoded:
+            _decoded[blob_hash] = (text, len(data))
+            _decoded_bytes += len(data)
+            while _decoded_bytes > DECODE_CACHE_BYTES:
+                _, (_, size) = _decoded.popitem(last=False)
+                _decoded_bytes -= size
+    return text
+
+
+def resolve_text(value: Any, default: str = "") -> str:
+    """
+    Return a state value as text, loading it from the blob store if it is a reference.
+    Recently decoded blobs are cached per process (up to DECODE_CACHE_BYTES in total),
+    so the nodes of a run usually share one copy.
+    """
+    if value is None:
+        return default
+    if is_blob_ref(value):
+        return _decode_blob(value["$blob"])
+    return value
+
+
+def offload_large_values(state: Dict[str, Any], threshold: Optional[int] = None) -> Dict[str, Any]:
+    """Replace large top-level string values in `state` with blob references (in place)."""
+    threshold = BLOB_THRESHOLD if threshold is None else threshold
+    for key, value in state.items():
+        if isinstance(value, str) and len(value) >= threshold:
+            state[key] = put_blob(value.encode("utf-8"))
+    return state
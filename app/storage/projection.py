@@ -0,0 +1,67 @@
+# storage/projection.py
+"""
+Field projection for run data.
+
+Paths are dot-separated keys, e.g. "final_state.quality_score" or "log".
+`fields` keeps only the listed paths; `exclude` drops paths.
+"""
+from typing import Any, Dict, List, Optional
+
+_MISSING = object()
+
+
+def parse_paths(value: Optional[str]) -> List[List[str]]:
+    """Parse a comma-separated query value into split paths."""
+    if not value:
+        return []
+    return [p.strip().split(".") for p in value.split(",") if p.strip()]
+
+
+def sqlite_json_path(path: List[str]) -> Optional[str]:
+    """SQLite JSON path for `path`, or None if a key can't be expressed safely."""
+    if any('"' in key or "\\" in key for key in path):
+        return None
+    return "$." + ".".join(f'"{key}"' for key in path)
+
+
+def get_path(data: Any, path: List[str]) -> Any:
+    for key in path:
+        if not isinstance(data, dict) or key not in data:
+            return _MISSING
+        data = data[key]
+    return data
+
+
+def set_path(data: Dict[str, Any], path: List[str], value: Any):
+    for key in path[:-1]:
+        data = data.setdefault(key, {})
+    data[path[-1]] = value
+
+
+def remove_path(data: Dict[str, Any], path: List[str]) -> Dict[str, Any]:
+    """Return `data` without `path`, copying only the dicts along the path."""
+    if not isinstance(data, dict) or path[0] not in data:
+        return data
+    data = dict(data)
+    if len(path) == 1:
+        del data[path[0]]
+    else:
+        data[path[0]] = remove_path(data[path[0]], path[1:])
+    return data
+
+
+def project(
+    data: Dict[str, Any],
+    fields: List[List[str]],
+    exclude: List[List[str]],
+) -> Dict[str, Any]:
+    if fields:
+        selected: Dict[str, Any] = {}
+        for path in fields:
+            value = get_path(data, path)
+            if value is not _MISSING:
+                set_path(selected, path, value)
+        data = selected
+    for path in exclude:
+        data = remove_path(data, path)
+    return data
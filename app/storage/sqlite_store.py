@@ -1,17 +1,32 @@
+import hashlib
 import json
 import sqlite3
+import time
 from pathlib import Path
-from typing import Optional
+from typing import Any, Dict, Iterator, List, Optional, Tuple
 
 from models.graph_models import GraphDefinition
-from models.run_models import RunRecord
+from models.run_models import RunRecord, RunStatus
+from storage.projection import project, set_path, sqlite_json_path
 
 DB_PATH = Path(__file__).resolve().parent / "workflow.db"
 
+# Job queue settings (shared by the API process and all worker processes)
+LEASE_SECONDS = 30  # a claimed job is re-queued if not heartbeated within this window
+MAX_ATTEMPTS = 3  # give up on a job after this many expired leases
+
+
+class JobStatus:
+    QUEUED = "QUEUED"
+    CLAIMED = "CLAIMED"
+    DONE = "DONE"
+    FAILED = "FAILED"
+
 
 def _get_conn():
-    # check_same_thread=False allows use across threads in FastAPI/uvicorn
-    conn = sqlite3.connect(DB_PATH, check_same_thread=False)
+    # check_same_thread=False allows use across threads in FastAPI/uvicorn;
+    # timeout lets concurrent worker processes wait on the write lock
+    conn = sqlite3.connect(DB_PATH, check_same_thread=False, timeout=30)
     conn.row_factory = sqlite3.Row
     return conn
 
@@ -19,14 +34,26 @@ def _get_conn():
 def init_db():
     conn = _get_conn()
     cur = conn.cursor()
+    # WAL lets readers (API) proceed while workers write
+    cur.execute("PRAGMA journal_mode=WAL")
+    # API and every worker run this at startup; one write transaction keeps the
+    # schema check + migration below from racing across processes
+    cur.execute("BEGIN IMMEDIATE")
     cur.execute(
         """
         CREATE TABLE IF NOT EXISTS graphs (
             id TEXT PRIMARY KEY,
-            data TEXT NOT NULL
+            data TEXT NOT NULL,
+            version TEXT
         )
         """
     )
+    # Older databases lack graphs.version; add and backfill it
+    columns = [row["name"] for row in cur.execute("PRAGMA table_info(graphs)")]
+    if "version" not in columns:
+        cur.execute("ALTER TABLE graphs ADD COLUMN version TEXT")
+    for row in cur.execute("SELECT id, data FROM graphs WHERE version IS NULL").fetchall():
+        cur.execute("UPDATE graphs SET version = ? WHERE id = ?", (_graph_version(row["data"]), row["id"]))
     cur.execute(
         """
         CREATE TABLE IF NOT EXISTS runs (
@@ -36,18 +63,41 @@ def init_db():
         )
         """
     )
+    cur.execute(
+        """
+        CREATE TABLE IF NOT EXISTS jobs (
+            id TEXT PRIMARY KEY,
+            graph_id TEXT NOT NULL,
+            status TEXT NOT NULL,
+            worker_id TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            created_at REAL NOT NULL,
+            heartbeat_at REAL,
+            lease_expires_at REAL
+        )
+        """
+    )
+    cur.execute(
+        "CREATE INDEX IF NOT EXISTS idx_jobs_status ON jobs (status, created_at)"
+    )
     conn.commit()
     conn.close()
 
 
+def _graph_version(data: str) -> str:
+    # Content hash: changes whenever the stored definition changes
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
 def save_graph(graph: GraphDefinition):
+    data = json.dumps(graph.model_dump())
     conn = _get_conn()
     cur = conn.cursor()
     cur.execute(
         """
-        INSERT OR REPLACE INTO graphs (id, data) VALUES (?, ?)
+        INSERT OR REPLACE INTO graphs (id, data, version) VALUES (?, ?, ?)
         """,
-        (graph.id, json.dumps(graph.model_dump())),
+        (graph.id, data, _graph_version(data)),
     )
     conn.commit()
     conn.close()
@@ -65,6 +115,16 @@ def get_graph(graph_id: str) -> Optional[GraphDefinition]:
     return GraphDefinition.model_validate(data)
 
 
+def get_graph_version(graph_id: str) -> Optional[str]:
+    """Content hash of a stored graph; a cheap check for cached compiled graphs."""
+    conn = _get_conn()
+    cur = conn.cursor()
+    cur.execute("SELECT version FROM graphs WHERE id = ?", (graph_id,))
+    row = cur.fetchone()
+    conn.close()
+    return row["version"] if row else None
+
+
 def save_run(run: RunRecord):
     conn = _get_conn()
     cur = conn.cursor()
@@ -88,3 +148,254 @@ def get_run(run_id: str) -> Optional[RunRecord]:
         return None
     data = json.loads(row["data"])
     return RunRecord.model_validate(data)
+
+
+def get_run_data(run_id: str, exclude: Optional[List[List[str]]] = None) -> Optional[str]:
+    """
+    Raw stored JSON for a run, skipping model validation.
+    `exclude` paths are removed by SQLite (json_remove) when it supports them.
+    """
+    exclude = exclude or []
+    sql_paths = [sqlite_json_path(p) for p in exclude]
+    conn = _get_conn()
+    cur = conn.cursor()
+    try:
+        if exclude and None not in sql_paths:
+            try:
+                placeholders = ", ".join("?" for _ in sql_paths)
+                cur.execute(
+                    f"SELECT json_remove(data, {placeholders}) AS data FROM runs WHERE id = ?",
+                    (*sql_paths, run_id),
+                )
+                row = cur.fetchone()
+                return row["data"] if row else None
+            except sqlite3.OperationalError:
+                pass  # SQLite built without JSON support; project in Python below
+        cur.execute("SELECT data FROM runs WHERE id = ?", (run_id,))
+        row = cur.fetchone()
+    finally:
+        conn.close()
+    if not row:
+        return None
+    if not exclude:
+        return row["data"]
+    return json.dumps(project(json.loads(row["data"]), [], exclude))
+
+
+def open_run_data(run_id: str, chunk_size: int = 64 * 1024) -> Optional[Tuple[int, Iterator[bytes]]]:
+    """
+    Stored JSON for a run as (size in bytes, chunk iterator). Chunks are read
+    incrementally from SQLite (blob I/O), so large records are never held in
+    memory as one string. The iterator keeps its read snapshot until exhausted.
+    """
+    conn = _get_conn()
+    cur = conn.cursor()
+    cur.execute("BEGIN")  # pin a read snapshot: INSERT OR REPLACE may move the row
+    cur.execute("SELECT rowid, length(CAST(data AS BLOB)) AS size FROM runs WHERE id = ?", (run_id,))
+    row = cur.fetchone()
+    if not row:
+        conn.close()
+        return None
+
+    def chunks():
+        try:
+            if not hasattr(conn, "blobopen"):  # Python < 3.11
+                cur.execute("SELECT data FROM runs WHERE rowid = ?", (row["rowid"],))
+                yield cur.fetchone()["data"].encode("utf-8")
+                return
+            with conn.blobopen("runs", "data", row["rowid"], readonly=True) as blob:
+                while True:
+                    data = blob.read(chunk_size)
+                    if not data:
+                        break
+                    yield data
+        finally:
+            conn.close()
+
+    return row["size"], chunks()
+
+
+def get_run_fields(run_id: str, fields: List[List[str]]) -> Optional[Dict[str, Any]]:
+    """
+    Only the requested paths of a stored run. SQLite extracts each path so the
+    full record (state, log) is never parsed in Python.
+    """
+    sql_paths = [sqlite_json_path(p) for p in fields]
+    if None not in sql_paths:
+        conn = _get_conn()
+        cur = conn.cursor()
+        try:
+            columns = ", ".join("data -> ?" for _ in sql_paths)
+            cur.execute(f"SELECT {columns} FROM runs WHERE id = ?", (*sql_paths, run_id))
+            row = cur.fetchone()
+            if not row:
+                return None
+            selected: Dict[str, Any] = {}
+            for path, value in zip(fields, row):
+                if value is not None:
+                    set_path(selected, path, json.loads(value))
+            return selected
+        except sqlite3.OperationalError:
+            pass  # SQLite < 3.38 has no '->' operator; project in Python below
+        finally:
+            conn.close()
+
+    data = get_run_data(run_id)
+    if data is None:
+        return None
+    return project(json.loads(data), fields, [])
+
+
+# --- Job queue ---
+# A job's id is the id of the RunRecord it executes; the run's stored state is
+# the job's input, so the payload is not duplicated in the jobs table.
+
+
+def _fail_runs(cur: sqlite3.Cursor, run_ids: List[str], error: str):
+    # Mark runs FAILED on the caller's connection, inside its transaction
+    for run_id in run_ids:
+        cur.execute("SELECT data FROM runs WHERE id = ?", (run_id,))
+        row = cur.fetchone()
+        if not row:
+            continue
+        data = json.loads(row["data"])
+        data["status"] = RunStatus.FAILED
+        data["error"] = error
+        cur.execute("UPDATE runs SET data = ? WHERE id = ?", (json.dumps(data), run_id))
+
+
+def enqueue_job(run_id: str, graph_id: str):
+    conn = _get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        """
+        INSERT INTO jobs (id, graph_id, status, created_at) VALUES (?, ?, ?, ?)
+        """,
+        (run_id, graph_id, JobStatus.QUEUED, time.time()),
+    )
+    conn.commit()
+    conn.close()
+
+
+def claim_job(worker_id: str, lease_seconds: float = LEASE_SECONDS) -> Optional[sqlite3.Row]:
+    """
+    Atomically claim the oldest queued job, or a claimed job whose lease expired.
+    Returns the claimed row, or None if there is nothing to do.
+    """
+    now = time.time()
+    conn = _get_conn()
+    cur = conn.cursor()
+    # IMMEDIATE takes the write lock up front so two workers can't claim the same job
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        # Jobs out of leases fail, and so do their runs, so pollers see a final status
+        cur.execute(
+            """
+            SELECT id FROM jobs
+            WHERE status = ? AND lease_expires_at < ? AND attempts >= ?
+            """,
+            (JobStatus.CLAIMED, now, MAX_ATTEMPTS),
+        )
+        expired = [r["id"] for r in cur.fetchall()]
+        for job_id in expired:
+            cur.execute(
+                "UPDATE jobs SET status = ?, lease_expires_at = NULL WHERE id = ?",
+                (JobStatus.FAILED, job_id),
+            )
+        _fail_runs(cur, expired, f"Job lease expired after {MAX_ATTEMPTS} attempts")
+        cur.execute(
+            """
+            SELECT id FROM jobs
+            WHERE status = ? OR (status = ? AND lease_expires_at < ?)
+            ORDER BY created_at
+            LIMIT 1
+            """,
+            (JobStatus.QUEUED, JobStatus.CLAIMED, now),
+        )
+        row = cur.fetchone()
+        if row is None:
+            conn.commit()
+            return None
+        cur.execute(
+            """
+            UPDATE jobs
+            SET status = ?, worker_id = ?, attempts = attempts + 1,
+                heartbeat_at = ?, lease_expires_at = ?
+            WHERE id = ?
+            """,
+            (JobStatus.CLAIMED, worker_id, now, now + lease_seconds, row["id"]),
+        )
+        cur.execute("SELECT * FROM jobs WHERE id = ?", (row["id"],))
+        job = cur.fetchone()
+        conn.commit()
+        return job
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def heartbeat_job(job_id: str, worker_id: str, lease_seconds: float = LEASE_SECONDS) -> bool:
+    """Extend the lease on a claimed job. Returns False if the lease was lost."""
+    now = time.time()
+    conn = _get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        """
+        UPDATE jobs SET heartbeat_at = ?, lease_expires_at = ?
+        WHERE id = ? AND worker_id = ? AND status = ?
+        """,
+        (now, now + lease_seconds, job_id, worker_id, JobStatus.CLAIMED),
+    )
+    conn.commit()
+    updated = cur.rowcount == 1
+    conn.close()
+    return updated
+
+
+def release_job(job_id: str, worker_id: str, error: str):
+    """
+    Give up a claimed job (e.g. the worker is shutting down). It is re-queued
+    for another worker, or failed together with its run on the last attempt.
+    """
+    conn = _get_conn()
+    cur = conn.cursor()
+    cur.execute("BEGIN IMMEDIATE")
+    try:
+        cur.execute(
+            "SELECT attempts FROM jobs WHERE id = ? AND worker_id = ? AND status = ?",
+            (job_id, worker_id, JobStatus.CLAIMED),
+        )
+        row = cur.fetchone()
+        if row is not None and row["attempts"] >= MAX_ATTEMPTS:
+            cur.execute(
+                "UPDATE jobs SET status = ?, lease_expires_at = NULL WHERE id = ?",
+                (JobStatus.FAILED, job_id),
+            )
+            _fail_runs(cur, [job_id], f"{error} on attempt {row['attempts']} of {MAX_ATTEMPTS}")
+        elif row is not None:
+            cur.execute(
+                "UPDATE jobs SET status = ?, worker_id = NULL, lease_expires_at = NULL WHERE id = ?",
+                (JobStatus.QUEUED, job_id),
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def complete_job(job_id: str, worker_id: str, status: str = JobStatus.DONE):
+    conn = _get_conn()
+    cur = conn.cursor()
+    cur.execute(
+        """
+        UPDATE jobs SET status = ?, lease_expires_at = NULL
+        WHERE id = ? AND worker_id = ?
+        """,
+        (status, job_id, worker_id),
+    )
+    conn.commit()
+    conn.close()
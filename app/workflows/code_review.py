@@ -1,7 +1,8 @@
 # workflows/code_review.py
 from typing import Dict, Any
-from models.graph_models import GraphDefinition, GraphNodeConfig
+from models.graph_models import GraphDefinition, GraphNodeConfig, LoopConfig
 from engine.registry import tool_registry
+from storage.blob_store import resolve_text
 
 
 def register_code_review_tools():
@@ -9,7 +10,7 @@ def register_code_review_tools():
     
     def extract_functions(state: Dict[str, Any]) -> Dict[str, Any]:
         """Extract function names from code."""
-        code = state.get("code", "")
+        code = resolve_text(state.get("code"))
         # Simple function extraction (looks for 'def ' keyword)
         functions = []
         for line in code.split('\n'):
@@ -23,7 +24,7 @@ def register_code_review_tools():
     
     def check_complexity(state: Dict[str, Any]) -> Dict[str, Any]:
         """Check code complexity metrics."""
-        code = state.get("code", "")
+        code = resolve_text(state.get("code"))
         lines = [line for line in code.split('\n') if line.strip()]
         functions = state.get("functions", [])
         
@@ -36,7 +37,7 @@ def register_code_review_tools():
     
     def detect_issues(state: Dict[str, Any]) -> Dict[str, Any]:
         """Detect basic code issues."""
-        code = state.get("code", "")
+        code = resolve_text(state.get("code"))
         issues = {
             "missing_docstrings": 0,
             "long_lines": 0,
@@ -84,8 +85,6 @@ def register_code_review_tools():
         issues = state.get("issues", {})
         complexity = state.get("complexity", {})
         threshold = state.get("threshold", 0.8)
-        loop_count = state.get("_loop_count", 0)
-        MAX_LOOPS = 3  # Prevent infinite loops
         
         # Calculate quality score (simple heuristic)
         total_issues = sum(issues.values())
@@ -99,16 +98,13 @@ def register_code_review_tools():
         
         state["quality_score"] = max(0.0, min(1.0, base_score))
         
-        # Loop back to suggestions if quality is below threshold
-        if state["quality_score"] < threshold and loop_count < MAX_LOOPS:
-            state["_loop_count"] = loop_count + 1
+        # Loop back to suggestions if quality is below threshold.
+        # The engine bounds the loop and stops it once state stops changing.
+        if state["quality_score"] < threshold:
             state["_next_node"] = "suggestions"  # Loop back to suggestions
         else:
             # Workflow complete
-            if loop_count >= MAX_LOOPS:
-                state["_loop_message"] = f"Reached max loops ({MAX_LOOPS}), stopping."
-            else:
-                state["_loop_message"] = "Quality threshold met!"
+            state["_loop_message"] = "Quality threshold met!"
         
         return state
     
@@ -138,5 +134,12 @@ def create_code_review_graph() -> GraphDefinition:
             "suggestions": "quality",
             "quality": None,  # End of workflow
         },
+        loops={
+            "quality": LoopConfig(
+                target="suggestions",
+                max_iterations=3,
+                watch=["issues", "suggestions", "quality_score"],
+            ),
+        },
         start_node="extract"
     )